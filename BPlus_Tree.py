@@ -1,4 +1,73 @@
+import sys
+import json
 import sqlite3
+from tree_metrics import TreeMetrics
+
+FULL_RANGE = ("0000-00-00 00:00:00", "9999-12-31 23:59:59")
+
+# Bytes per list slot (key or child reference) in the memory estimate
+POINTER_SIZE = 8
+
+SNAPSHOT_HEADER = {'format': 'bptree-snapshot', 'version': 2,
+                   'columns': ['timestamp', 'sensor_id', 'value', 'location', 'data_type']}
+
+
+def write_snapshot(path, chunks):
+    
+    # Snapshot = JSON header line followed by one JSON array of row arrays per
+    # line, in key order, so it can be written and read one chunk at a time.
+    # Plain JSON (not pickle) so loading a file can never execute code.
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(SNAPSHOT_HEADER) + '\n')
+        for chunk in chunks:
+            chunk = list(chunk)
+            f.write(json.dumps(chunk, separators=(',', ':')) + '\n')
+            count += len(chunk)
+    return count
+
+
+def read_snapshot(path):
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except (ValueError, UnicodeDecodeError):
+            header = None
+        if not isinstance(header, dict) or header.get('format') != SNAPSHOT_HEADER['format']:
+            raise ValueError(f"{path} is not a B+ tree snapshot")
+        if header.get('version') != SNAPSHOT_HEADER['version']:
+            raise ValueError(f"{path}: unsupported snapshot version {header.get('version')!r}")
+        for line in f:
+            yield [tuple(row) for row in json.loads(line)]
+
+
+def aggregate_records(results):
+
+    # Summary of (timestamp, record) pairs; min/max ties go to the earliest row
+    if not results:
+        return {
+            'total': 0,
+            'average': 0,
+            'min': None,
+            'max': None,
+            'min_time': None,
+            'max_time': None,
+        }
+
+    values = [(record[1]['value'], record[0]) for record in results]
+    total = sum(value for value, _ in values)
+    min_value, min_time = min(values, key=lambda x: x[0])
+    max_value, max_time = max(values, key=lambda x: x[0])
+    return {
+        'total': total,
+        'average': total / len(values),
+        'min': min_value,
+        'max': max_value,
+        'min_time': min_time,
+        'max_time': max_time,
+    }
+
 
 class BPlusTreeNode:
     def __init__(self, leaf=False):
@@ -9,12 +78,21 @@ class BPlusTreeNode:
         self.id_index = {} 
 
 class BPlusTree:
-    def __init__(self, order=20, database_path=None, table_name="sensor_data"):
+    def __init__(self, order=20, database_path=None, table_name="sensor_data", metrics=None):
         self.root = BPlusTreeNode(leaf=True)  
         self.order = order  
         self.database_path = database_path  
         self.table_name = table_name  
         self.id_index = {} 
+        self.record_count = 0
+        # Kept current by _insert_non_full/_split_child so stats() never walks the tree
+        self.node_count = 1
+        self._record_size = None
+        # (start_key, end_key) of the keys fully resident in memory, None when cold
+        self.loaded_range = None
+        self.metrics = None
+        if metrics is not None:
+            self.enable_metrics(metrics)
         if self.database_path:
             self._initialize_database()  
             self._initialize_secondary_index()  
@@ -86,12 +164,21 @@ class BPlusTree:
 
     def _insert_non_full(self, node, key, value):
        
+        # A full root is split under a new root, the only way the tree grows in height
+        if node is self.root and len(node.keys) == (self.order - 1):
+            self.root = BPlusTreeNode()
+            self.root.children.append(node)
+            self.node_count += 1
+            self._split_child(self.root, 0)
+            node = self.root
+
         if node.leaf:
             # nodes insert
             idx = 0
             while idx < len(node.keys) and key > node.keys[idx][0]:
                 idx += 1
             node.keys.insert(idx, (key, value))
+            self.record_count += 1
         else:
             
             idx = 0
@@ -109,6 +196,8 @@ class BPlusTree:
         new_node = BPlusTreeNode(leaf=full_node.leaf)
         mid_index = (self.order - 1) // 2
         if full_node.leaf:
+            # Separator is the largest key left behind; keys <= separator route left
+            parent.keys.insert(index, full_node.keys[mid_index])
             new_node.keys = full_node.keys[mid_index + 1:]
             full_node.keys = full_node.keys[:mid_index + 1]
             new_node.next_leaf = full_node.next_leaf
@@ -120,6 +209,9 @@ class BPlusTree:
             new_node.children = full_node.children[mid_index + 1:]
             full_node.children = full_node.children[:mid_index + 1]
         parent.children.insert(index + 1, new_node)
+        self.node_count += 1
+        if self.metrics is not None:
+            self.metrics.inc('splits')
 
     def _insert_into_database(self, key, sensor_id, value, location, data_type):
         
@@ -131,12 +223,14 @@ class BPlusTree:
         """, (key, sensor_id, value, location, data_type))
         conn.commit()
         conn.close()
+        if self.metrics is not None:
+            self.metrics.inc('rows_flushed')
 
     def query_by_id(self, sensor_id):
         
        
         if sensor_id in self.id_index:
-            records = self.id_index[sensor_id].range_query("0000-00-00 00:00:00", "9999-12-31 23:59:59")
+            records = self.id_index[sensor_id].range_query(*FULL_RANGE)
             return [(timestamp, {'sensor_id': sensor_id, **value}) for timestamp, value in records]
         else:
             return []
@@ -144,16 +238,34 @@ class BPlusTree:
     def range_query(self, start_key, end_key):
         
         result = []
+        leaves = 0
         node = self._find_leaf_node(start_key)
         while node is not None:
+            leaves += 1
             for key, value in node.keys:
                 if start_key <= key <= end_key:
                     result.append((key, value))
                 elif key > end_key:
-                    return result
-            node = node.next_leaf
+                    node = None
+                    break
+            else:
+                node = node.next_leaf
+        if self.metrics is not None:
+            self.metrics.inc('leaves_scanned', leaves)
         return result
 
+    def iter_range(self, start_key, end_key):
+        
+        # Same walk as range_query, yielding records instead of building a list
+        node = self._find_leaf_node(start_key)
+        while node is not None:
+            for key, value in node.keys:
+                if start_key <= key <= end_key:
+                    yield key, value
+                elif key > end_key:
+                    return
+            node = node.next_leaf
+
     def search(self, key):
        
         node = self._find_leaf_node(key)  
@@ -166,52 +278,136 @@ class BPlusTree:
     def _find_leaf_node(self, key):
        
         node = self.root
+        visited = 1
         while not node.leaf:
             idx = 0
             while idx < len(node.keys) and key > node.keys[idx][0]:
                 idx += 1
             node = node.children[idx]
+            visited += 1
+        if self.metrics is not None:
+            self.metrics.inc('nodes_visited', visited)
         return node
-    
-    
-    
-    def range_query_with_aggregation(self, start_key, end_key):
+
+    def tree_statistics(self):
         
+        # Walks only the leftmost and rightmost paths, O(height)
+        height = 1
+        node = self.root
+        while not node.leaf:
+            node = node.children[0]
+            height += 1
+        while node is not None and not node.keys:
+            node = node.next_leaf
+        min_key = node.keys[0][0] if node is not None else None
+
+        node = self.root
+        while not node.leaf:
+            node = node.children[-1]
+        max_key = node.keys[-1][0] if node.keys else None
+
+        return {
+            'height': height,
+            'records': self.record_count,
+            'sensors': len(self.id_index),
+            'min_key': min_key,
+            'max_key': max_key,
+        }
+
+    def save_snapshot(self, path, chunk_size=10000):
         
-        results = self.range_query(start_key, end_key)
+        def chunks():
+            chunk = []
+            for key, value in self.range_query(*FULL_RANGE):
+                chunk.append((key, value['sensor_id'], value['value'], value['location'], value['data_type']))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        return write_snapshot(path, chunks())
 
-        if not results:
-            return {
-                'data': [],
-                'aggregation': {
-                    'total': 0,
-                    'average': 0,
-                    'min': None,
-                    'max': None,
-                    'min_time': None,
-                    'max_time': None,
-                },
-            }
+    @classmethod
+    def load_snapshot(cls, path, order=20):
+        
+        bpt = cls(order=order)
+        for chunk in read_snapshot(path):
+            for row in chunk:
+                bpt.insert(*row)
+        bpt.loaded_range = FULL_RANGE
+        return bpt
 
+    def enable_metrics(self, metrics=None):
         
-        values = [(record[1]['value'], record[0]) for record in results]
-        total = sum(value for value, _ in values)
-        avg = total / len(values)
-        min_value, min_time = min(values, key=lambda x: x[0])
-        max_value, max_time = max(values, key=lambda x: x[0])
+        # Wraps the public operations with timers; counters are updated inline
+        self.disable_metrics()
+        self.metrics = metrics if metrics is not None else TreeMetrics()
+        self.metrics.instrument(self)
+        return self.metrics
+
+    def disable_metrics(self):
         
+        if self.metrics is not None:
+            self.metrics.uninstrument(self)
+        self.metrics = None
+
+    def stats(self):
         
-        return {
-            'data': results,
-            'aggregation': {
-                'total': total,
-                'average': avg,
-                'min': min_value,
-                'max': max_value,
-                'min_time': min_time,
-                'max_time': max_time,
-            },
+        # O(height): node and record counts are maintained incrementally. The
+        # exporter thread calls this while the main thread may add sensors, so
+        # the secondary index is copied before iterating.
+        tree_stats = self.tree_statistics()
+        node_count, memory = self._memory_estimate()
+        for sub_tree in list(self.id_index.values()):
+            sub_nodes, sub_memory = sub_tree._memory_estimate()
+            node_count += sub_nodes
+            memory += sub_memory
+        gauges = {
+            'height': tree_stats['height'],
+            'records': self.record_count,
+            'node_count': node_count,
+            'memory_estimate_bytes': memory,
         }
+        if self.metrics is None:
+            return {'enabled': False, 'gauges': gauges}
+        return {'enabled': True, 'gauges': gauges, **self.metrics.snapshot()}
+
+    def _memory_estimate(self):
+        
+        # Rough: node/list overhead plus a pointer slot per node, and one
+        # record size (sampled once from the leftmost leaf) per key
+        if self._record_size is None and self.record_count:
+            node = self.root
+            while not node.leaf:
+                node = node.children[0]
+            while node is not None and not node.keys:
+                node = node.next_leaf
+            if node is not None:
+                key, value = node.keys[0]
+                self._record_size = (sys.getsizeof(node.keys[0]) + sys.getsizeof(key) + sys.getsizeof(value)
+                                     + sum(sys.getsizeof(v) for v in value.values()))
+        node_size = sys.getsizeof(self.root) + 2 * sys.getsizeof([]) + 2 * POINTER_SIZE
+        record_size = (self._record_size or 0) + POINTER_SIZE
+        return self.node_count, self.node_count * node_size + self.record_count * record_size
+
+    def covers(self, start_key, end_key):
+        
+        if self.loaded_range is None:
+            return False
+        return self.loaded_range[0] <= start_key and end_key <= self.loaded_range[1]
+
+    def uncached_days(self, start_key, end_key):
+        
+        # Days the tree would have to load to answer [start_key, end_key];
+        # None when it cannot answer from memory at all
+        return 0 if self.covers(start_key, end_key) else None
+    
+    
+    
+    def range_query_with_aggregation(self, start_key, end_key):
+
+        results = self.range_query(start_key, end_key)
+        return {'data': results, 'aggregation': aggregate_records(results)}
         
         
         
@@ -227,6 +423,7 @@ class BPlusTree:
                 if start_key <= key <= end_key:
                     continue  
                 new_keys.append((key, value))
+            self.record_count -= len(node.keys) - len(new_keys)
             node.keys = new_keys
 
             
@@ -252,25 +449,29 @@ class BPlusTree:
         """, (start_key, end_key))
         conn.commit()
         conn.close()
+        if self.metrics is not None:
+            self.metrics.inc('rows_deleted', cursor.rowcount)
 
     def _delete_from_secondary_index(self, start_key, end_key):
         
         
         for sensor_id in list(self.id_index.keys()):
-            node = self.id_index[sensor_id]._find_leaf_node(start_key)
+            sub_tree = self.id_index[sensor_id]
+            node = sub_tree._find_leaf_node(start_key)
             while node is not None:
                 new_keys = []
                 for key, value in node.keys:
                     if start_key <= key <= end_key:
                         continue  
                     new_keys.append((key, value))
+                sub_tree.record_count -= len(node.keys) - len(new_keys)
                 node.keys = new_keys
 
                 if node.keys and node.keys[-1][0] > end_key:
                     break
                 node = node.next_leaf
 
-            if not self.id_index[sensor_id].root.keys:
+            if sub_tree.record_count == 0:
                 del self.id_index[sensor_id]
       
       
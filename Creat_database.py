@@ -1,140 +1,275 @@
 import sqlite3
 import os
+import sys
 import random
+import argparse
 import datetime
+import time
+from BPlus_Tree import write_snapshot
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-database_path = '/Users/xingwenbo/Desktop/4525_FinalProject/sensor_data.db'
 
-if os.path.exists(database_path):
-    os.remove(database_path)
+LOCATIONS = ['Field_1', 'Field_2', 'Field_3', 'Field_4', 'Field_5', 'Field_6', 'Field_7', 'Field_8', 'Field_9']
+DATA_TYPES = ['Temp', 'Humidity', 'Light']
+START_TIME = datetime.datetime(2024, 1, 1, 1, 0, 0)
 
-conn = sqlite3.connect(database_path)
-cursor = conn.cursor()
 
+def generator_backend(backend=None):
 
-cursor.execute('''
-CREATE TABLE sensor_data (
-    timestamp TIMESTAMP NOT NULL,
-    sensor_id INTEGER NOT NULL,
-    value REAL NOT NULL,
-    location TEXT NOT NULL,
-    data_type TEXT NOT NULL,
-    PRIMARY KEY (timestamp, sensor_id)
-)
-''')
+    # 'numpy' or 'python'; None picks NumPy when it is installed
+    if backend is None:
+        return 'numpy' if np is not None else 'python'
+    if backend == 'numpy' and np is None:
+        raise ValueError("NumPy is not installed")
+    if backend not in ('numpy', 'python'):
+        raise ValueError(f"Unknown generator backend {backend!r}")
+    return backend
 
 
-sample_data = []
+def generate_chunks(total_records, sensor_ids, interval_seconds=300, start_time=START_TIME,
+                    chunk_size=100000, value_range=(20.0, 80.0), locations=LOCATIONS,
+                    data_types=DATA_TYPES, seed=None, backend=None):
+    """
+    Yields lists of (timestamp, sensor_id, value, location, data_type) rows,
+    `chunk_size` at a time, with one reading every `interval_seconds`.
+    The two backends draw different random streams, so the same seed only
+    reproduces the same rows with the same backend.
+    """
+    if generator_backend(backend) == 'numpy':
+        generate, rng = _numpy_chunk, np.random.default_rng(seed)
+    else:
+        generate, rng = _python_chunk, random.Random(seed)
+    sensor_ids = list(sensor_ids)
+    for offset in range(0, total_records, chunk_size):
+        size = min(chunk_size, total_records - offset)
+        yield generate(rng, offset, size, sensor_ids, interval_seconds, start_time,
+                       value_range, locations, data_types)
 
-total_records = 10000  
-sensor_count = min(total_records, 90000) 
-sensor_ids = random.sample(range(10000, 10000 + sensor_count), sensor_count)  
 
+def _numpy_chunk(rng, offset, size, sensor_ids, interval_seconds, start_time,
+                 value_range, locations, data_types):
 
-locations = ['Field_1', 'Field_2', 'Field_3', 'Field_4', 'Field_5', 'Field_6', 'Field_7', 'Field_8', 'Field_9']
-data_types = ['Temp', 'Humidity', 'Light']
-start_time = datetime.datetime(2024, 1, 1, 1, 0, 0)
+    seconds = (offset + np.arange(size, dtype=np.int64)) * interval_seconds
+    stamps = np.datetime64(start_time, 's') + seconds.astype('timedelta64[s]')
+    timestamps = np.char.replace(np.datetime_as_string(stamps, unit='s'), 'T', ' ')
+    sensors = np.asarray(sensor_ids)[rng.integers(0, len(sensor_ids), size)]
+    values = np.round(rng.uniform(value_range[0], value_range[1], size), 1)
+    location = np.asarray(locations)[rng.integers(0, len(locations), size)]
+    data_type = np.asarray(data_types)[rng.integers(0, len(data_types), size)]
+    return list(zip(timestamps.tolist(), sensors.tolist(), values.tolist(),
+                    location.tolist(), data_type.tolist()))
 
 
-for i in range(total_records):
-    timestamp = start_time + datetime.timedelta(minutes=5 * i)  
-    sensor_id = random.choice(sensor_ids)
-    value = round(random.uniform(20.0, 80.0), 1)
-    location = random.choice(locations)
-    data_type = random.choice(data_types)
-    sample_data.append((timestamp.strftime('%Y-%m-%d %H:%M:%S'), sensor_id, value, location, data_type))
+def _python_chunk(rng, offset, size, sensor_ids, interval_seconds, start_time,
+                  value_range, locations, data_types):
 
-cursor.executemany('''
-    INSERT OR IGNORE INTO sensor_data (timestamp, sensor_id, value, location, data_type)
-    VALUES (?, ?, ?, ?, ?)
-    ''', sample_data)
+    # strftime only once per day; the time of day is built from integers
+    timestamps = []
+    day_cache = {}
+    base = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+    for i in range(offset, offset + size):
+        days, second = divmod(base + i * interval_seconds, 86400)
+        day = day_cache.get(days)
+        if day is None:
+            day = day_cache[days] = (start_time.date() + datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+        hour, second = divmod(second, 3600)
+        minute, second = divmod(second, 60)
+        timestamps.append(f"{day} {hour:02d}:{minute:02d}:{second:02d}")
 
+    low, span = value_range[0], value_range[1] - value_range[0]
+    uniform = rng.random
+    values = [round(low + span * uniform(), 1) for _ in range(size)]
+    return list(zip(timestamps, rng.choices(sensor_ids, k=size), values,
+                    rng.choices(locations, k=size), rng.choices(data_types, k=size)))
 
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON sensor_data (timestamp);')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_type ON sensor_data (data_type);')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_sensor_id ON sensor_data (sensor_id);')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_sensor_id ON sensor_data (timestamp, sensor_id);')
 
-   
-cursor.execute('''
-    CREATE VIEW IF NOT EXISTS hourly_average_view AS
-    SELECT
-        strftime('%Y-%m-%d %H:00:00', timestamp) AS hour,
-        AVG(value) AS avg_value
-    FROM sensor_data
-    GROUP BY strftime('%Y-%m-%d %H:00:00', timestamp)
-    ORDER BY hour;
-    ''')
+def create_table(cursor):
 
-  
-cursor.execute('''
-    CREATE VIEW IF NOT EXISTS daily_average_view AS
-    SELECT
-        strftime('%Y-%m-%d', timestamp) AS day,
-        AVG(value) AS avg_value
-    FROM sensor_data
-    GROUP BY strftime('%Y-%m-%d', timestamp)
-    ORDER BY day;
+    cursor.execute('''
+    CREATE TABLE sensor_data (
+        timestamp TIMESTAMP NOT NULL,
+        sensor_id INTEGER NOT NULL,
+        value REAL NOT NULL,
+        location TEXT NOT NULL,
+        data_type TEXT NOT NULL,
+        PRIMARY KEY (timestamp, sensor_id)
+    )
     ''')
 
 
-cursor.execute('''
-    CREATE TRIGGER IF NOT EXISTS maintain_order_trigger
-    BEFORE INSERT ON sensor_data
-    FOR EACH ROW
-    
-    WHEN NEW.timestamp <= (SELECT MAX(timestamp) FROM sensor_data WHERE sensor_id = NEW.sensor_id)
-    BEGIN
-        SELECT RAISE(ABORT, 'Timestamp for new data must be greater than the latest timestamp for the given sensor.');
-    END;
-    ''')
+def create_indexes_views_triggers(cursor):
 
-  
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS hourly_averages (
-        hour TEXT PRIMARY KEY,
-        avg_value REAL
-    )
-    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON sensor_data (timestamp);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_type ON sensor_data (data_type);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sensor_id ON sensor_data (sensor_id);')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_sensor_id ON sensor_data (timestamp, sensor_id);')
 
-    
-cursor.execute('''
-    CREATE TRIGGER IF NOT EXISTS update_hourly_avg_trigger
-    AFTER INSERT ON sensor_data
-    FOR EACH ROW
-    BEGIN
-        INSERT INTO hourly_averages (hour, avg_value)
-        VALUES (
-            strftime('%Y-%m-%d %H:00:00', NEW.timestamp),
-            (SELECT AVG(value) FROM sensor_data WHERE strftime('%Y-%m-%d %H:00:00', timestamp) = strftime('%Y-%m-%d %H:00:00', NEW.timestamp))
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS hourly_average_view AS
+        SELECT
+            strftime('%Y-%m-%d %H:00:00', timestamp) AS hour,
+            AVG(value) AS avg_value
+        FROM sensor_data
+        GROUP BY strftime('%Y-%m-%d %H:00:00', timestamp)
+        ORDER BY hour;
+        ''')
+
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS daily_average_view AS
+        SELECT
+            strftime('%Y-%m-%d', timestamp) AS day,
+            AVG(value) AS avg_value
+        FROM sensor_data
+        GROUP BY strftime('%Y-%m-%d', timestamp)
+        ORDER BY day;
+        ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS maintain_order_trigger
+        BEFORE INSERT ON sensor_data
+        FOR EACH ROW
+
+        WHEN NEW.timestamp <= (SELECT MAX(timestamp) FROM sensor_data WHERE sensor_id = NEW.sensor_id)
+        BEGIN
+            SELECT RAISE(ABORT, 'Timestamp for new data must be greater than the latest timestamp for the given sensor.');
+        END;
+        ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS hourly_averages (
+            hour TEXT PRIMARY KEY,
+            avg_value REAL
         )
-        ON CONFLICT(hour) DO UPDATE SET
-            avg_value = (SELECT AVG(value) FROM sensor_data WHERE strftime('%Y-%m-%d %H:00:00', timestamp) = strftime('%Y-%m-%d %H:00:00', NEW.timestamp));
-    END;
-    ''')
+        ''')
 
-    
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS delete_schedule (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        last_deleted TIMESTAMP
-    )
-    ''')
+    # Filled in one pass here; the trigger below keeps it current afterwards
+    cursor.execute('''
+        INSERT OR REPLACE INTO hourly_averages (hour, avg_value)
+        SELECT strftime('%Y-%m-%d %H:00:00', timestamp), AVG(value)
+        FROM sensor_data
+        GROUP BY strftime('%Y-%m-%d %H:00:00', timestamp)
+        ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS update_hourly_avg_trigger
+        AFTER INSERT ON sensor_data
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO hourly_averages (hour, avg_value)
+            VALUES (
+                strftime('%Y-%m-%d %H:00:00', NEW.timestamp),
+                (SELECT AVG(value) FROM sensor_data WHERE strftime('%Y-%m-%d %H:00:00', timestamp) = strftime('%Y-%m-%d %H:00:00', NEW.timestamp))
+            )
+            ON CONFLICT(hour) DO UPDATE SET
+                avg_value = (SELECT AVG(value) FROM sensor_data WHERE strftime('%Y-%m-%d %H:00:00', timestamp) = strftime('%Y-%m-%d %H:00:00', NEW.timestamp));
+        END;
+        ''')
 
-   
-def delete_old_data():
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS delete_schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            last_deleted TIMESTAMP
+        )
+        ''')
+
+
+def delete_old_data(cursor):
     cursor.execute('''
         DELETE FROM sensor_data
         WHERE timestamp < datetime('now', '-1 year')
         ''')
-conn.commit()
-print("Expired data has been deleted。")
 
 
-delete_old_data()
+def bulk_load(database_path, chunks, purge_expired=False):
+    """
+    Loads `chunks` into a fresh database. Indexes, views and triggers are
+    created only after the rows are in, and the load runs as one unjournaled
+    transaction.
+    """
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    conn = sqlite3.connect(database_path, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode = OFF')
+    cursor.execute('PRAGMA synchronous = OFF')
+    cursor.execute('PRAGMA cache_size = -200000')
+
+    create_table(cursor)
+    count = 0
+    cursor.execute('BEGIN')
+    for chunk in chunks:
+        cursor.executemany('''
+            INSERT OR IGNORE INTO sensor_data (timestamp, sensor_id, value, location, data_type)
+            VALUES (?, ?, ?, ?, ?)
+            ''', chunk)
+        count += len(chunk)
+    cursor.execute('COMMIT')
+
+    cursor.execute('BEGIN')
+    create_indexes_views_triggers(cursor)
+    if purge_expired:
+        delete_old_data(cursor)
+        print("Expired data has been deleted。")
+    cursor.execute('COMMIT')
+    cursor.execute('ANALYZE')
+
+    cursor.execute('PRAGMA journal_mode = DELETE')
+    cursor.execute('PRAGMA synchronous = FULL')
+    conn.close()
+    return count
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Generate sensor_data test data")
+    parser.add_argument("--rows", type=positive_int, default=10000, help="number of readings to generate")
+    parser.add_argument("--sensors", type=positive_int, default=None, help="number of distinct sensors (default: min(rows, 90000))")
+    parser.add_argument("--interval", type=int, default=300, help="seconds between consecutive readings")
+    parser.add_argument("--start", default=START_TIME.strftime('%Y-%m-%d %H:%M:%S'), help="first timestamp")
+    parser.add_argument("--path", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensor_data.db'),
+                        help="SQLite database to (re)create")
+    parser.add_argument("--snapshot", help="write a B+ tree snapshot to this file instead of SQLite")
+    parser.add_argument("--chunk-size", type=positive_int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--generator", choices=("numpy", "python"), default=None,
+                        help="random generator backend (default: NumPy when installed)")
+    parser.add_argument("--purge-expired", action="store_true", help="delete readings older than one year after loading")
+    args = parser.parse_args(argv)
+
+    sensor_count = args.sensors if args.sensors is not None else min(args.rows, 90000)
+    sensor_ids = random.Random(args.seed).sample(range(10000, 10000 + sensor_count), sensor_count)
+    start_time = datetime.datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S')
+    try:
+        backend = generator_backend(args.generator)
+    except ValueError as e:
+        parser.error(str(e))
+    chunks = generate_chunks(args.rows, sensor_ids, args.interval, start_time, args.chunk_size,
+                             seed=args.seed, backend=backend)
+
+    start = time.perf_counter()
+    if args.snapshot:
+        count = write_snapshot(args.snapshot, chunks)
+        target = args.snapshot
+    else:
+        count = bulk_load(args.path, chunks, purge_expired=args.purge_expired)
+        target = args.path
+    elapsed = time.perf_counter() - start
 
+    print(f"\n{count} rows generated in {elapsed:.2f} s ({backend} generator)")
+    print(f"{'Snapshot saved' if args.snapshot else 'Database Save'} at: {target}")
 
-conn.close()
 
-print(f"\nDatabase Save at: {database_path}")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,23 @@
+import os
 import sys
+import argparse
 import sqlite3
 import time
-from BPlus_Tree import BPlusTree
+import logging
+import itertools
+from BPlus_Tree import BPlusTree, FULL_RANGE
+from windowed_tree import WindowedBPlusTree
+from query_planner import QueryPlanner
+from tree_metrics import write_prometheus, serve_prometheus
 from tabulate import tabulate
+from export import FORMATS, record_rows, write_rows
+from Creat_database import positive_int
 from performance_test import performance_test
 from performance_test import generate_test_data, performance_test
 sys.stdout.reconfigure(encoding='utf-8')
 
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_data.db")
+
 
 
 
@@ -19,6 +30,7 @@ def print_menu():
         [" <<5>> ", "     ID Query"],
         [" <<6>> ", "     Performance Test"],
         [" <<7>> ", "Displays the first 20 pieces of data in the database"],
+        [" <<8>> ", "     Tree Metrics"],
         ["-" * 7, "-" * 52],
         [" <<0>> ", "     EXIT"],
     ]
@@ -34,17 +46,20 @@ def print_menu():
     print("+---------+","-"*52,"+")
 
 
-def display_database_records(database_path, table_name, limit=20):
-    conn = sqlite3.connect(database_path)
-    cursor = conn.cursor()
-    cursor.execute(f"""
-        SELECT timestamp, sensor_id, value, location, data_type
-        FROM {table_name}
-        ORDER BY timestamp ASC
-        LIMIT ?
-    """, (limit,))
-    records = cursor.fetchall()
-    conn.close()
+def display_database_records(database_path, table_name, limit=20, planner=None):
+    if planner is not None:
+        records = planner.first_records(limit)
+    else:
+        conn = sqlite3.connect(database_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {table_name}
+            ORDER BY timestamp ASC
+            LIMIT ?
+        """, (limit,))
+        records = cursor.fetchall()
+        conn.close()
 
     if records:
         headers = ["Timestamp", "Sensor ID", "Value", "Location", "Data Type"]
@@ -70,34 +85,97 @@ def load_data_from_database_to_bptree(bpt, database_path, table_name):
             'location': location,
             'data_type': data_type
         })
+    bpt.loaded_range = FULL_RANGE
     return len(records)
 
-def main():
-    
+def print_metrics(bpt):
+    stats = bpt.stats()
+    data = [[name, value] for name, value in stats['gauges'].items()]
+    if not stats['enabled']:
+        data.append(["(instrumentation)", "disabled, start with --metrics"])
+    else:
+        data += [[f"{name} (total)", value] for name, value in stats['counters'].items()]
+        data += [
+            [f"{op} calls / avg ms", f"{h['count']} / {h['sum'] / h['count'] * 1000:.3f}"]
+            for op, h in stats['histograms'].items() if h['count']
+        ]
+    print(tabulate(data, headers=["Metric", "Value"], tablefmt="grid"))
+
+def run_query(database_path, start_key=FULL_RANGE[0], end_key=FULL_RANGE[1], sensor_id=None, fmt="table",
+              output=None, page_size=50, hot_window_days=None, table_name="sensor_data"):
+    """
+    Non-interactive export. Without --window the tree stays cold, so the
+    planner streams the range straight from SQLite.
+    """
+    if hot_window_days is None:
+        bpt = BPlusTree(order=20)
+    else:
+        bpt = WindowedBPlusTree(order=20, database_path=database_path, table_name=table_name,
+                                hot_window_days=hot_window_days)
+    planner = QueryPlanner(bpt, database_path, table_name)
+
+    if sensor_id is not None:
+        records = planner.iter_by_id(sensor_id, start_key, end_key)
+    else:
+        records = planner.iter_range(start_key, end_key)
+
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        count = write_rows(record_rows(records), out, fmt, page_size=page_size)
+    finally:
+        if output:
+            out.close()
+    logging.info("%d rows written to %s", count, output or "stdout")
+    return count
+
+def main(hot_window_days=None, metrics=False, metrics_file=None, metrics_port=None,
+         database_path=DATABASE_PATH, snapshot=None):
     
-    database_path = "/Users/xingwenbo/Desktop/4525_FinalProject/sensor_data.db"
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     table_name = "sensor_data"
     
     #Start time
     start_time = time.perf_counter()
     
-    bpt = BPlusTree(order=20, database_path=database_path, table_name=table_name)
+    if snapshot:
+        # The snapshot replaces SQLite entirely: queries run from memory and
+        # edits are not written anywhere
+        bpt = BPlusTree.load_snapshot(snapshot, order=20)
+        database_path = None
+        data_count = bpt.record_count
+    elif hot_window_days is None:
+        bpt = BPlusTree(order=20, database_path=database_path, table_name=table_name)
 
-    # load database to B+ tree
-    data_count = load_data_from_database_to_bptree(bpt, database_path, table_name)
+        # load database to B+ tree
+        data_count = load_data_from_database_to_bptree(bpt, database_path, table_name)
+    else:
+        # Only the last `hot_window_days` days go into memory, older days are faulted in on demand
+        bpt = WindowedBPlusTree(order=20, database_path=database_path, table_name=table_name,
+                                hot_window_days=hot_window_days)
+        data_count = bpt.record_count
     
     #End time
     end_time = time.perf_counter()
     elapsed_time = end_time - start_time
     
     print(f"\n Loading data done! Total number of data: {data_count},  Run Times: {elapsed_time:.2f} s \n")
+    if snapshot:
+        print(f" Snapshot mode ({snapshot}): no database, changes are kept in memory only \n")
+
+    planner = QueryPlanner(bpt, database_path, table_name)
+
+    if metrics or metrics_file or metrics_port:
+        bpt.enable_metrics()
+    if metrics_port:
+        serve_prometheus(bpt, port=metrics_port)
+        print(f"Metrics at: http://127.0.0.1:{metrics_port}/metrics")
 
     #********************
     #Menu
     #********************
     while True:
         print_menu()
-        choice = input("\nInput Options  (1/2/3/4/5/6/7): ")
+        choice = input("\nInput Options  (1/2/3/4/5/6/7/8): ")
         
         
         if choice == '1':
@@ -108,6 +186,7 @@ def main():
             data_type = input("Input Data type: ")
             try:
                 bpt.insert(timestamp, sensor_id, float(value), location, data_type)
+                planner.invalidate()
                 print("Successful insert！")
             except ValueError as e:
                 print(f"Fail：{e}")
@@ -115,7 +194,7 @@ def main():
                 
         elif choice == '2':
             key = input("Input timeStamp (Format: YYYY-MM-DD HH:MM:SS): ")
-            result = bpt.search(key)
+            result = planner.search(key)
             if result:
                 headers = ["Timestamp", "Sensor ID", "Value", "Location", "Data Type"]
                 data = [[key, result['sensor_id'], result['value'], result['location'], result['data_type']]]
@@ -129,29 +208,26 @@ def main():
         elif choice == '3':  
             start_key = input("Enter the Start time: (Format: YYYY-MM-DD HH:MM:SS): ")
             end_key = input("Enter the End time (Format: YYYY-MM-DD HH:MM:SS): ")
-            result = bpt.range_query_with_aggregation(start_key, end_key)
+            records = planner.iter_range(start_key, end_key)
+            first = next(records, None)
 
-            # Output Query results 
-            if result['data']:
-                headers = ["Timestamp", "Sensor ID", "Value", "Location", "Data Type"]
-                data = [
-                    [record[0], record[1]['sensor_id'], record[1]['value'], record[1]['location'], record[1]['data_type']]
-                    for record in result['data']
-                ]
+            # Output Query results, streamed page by page
+            if first is not None:
                 print(f"\nRange {start_key} to {end_key} Query results：")
-                print(tabulate(data, headers=headers, tablefmt="grid"))
+                write_rows(record_rows(itertools.chain([first], records)), sys.stdout, "table")
 
                 # results
+                aggregation = planner.range_aggregate(start_key, end_key)
                 aggregation_data = [
-                    ["  <<SUM>>  ", result['aggregation']['total']],
-                    ["<<Average>>", f"{result['aggregation']['average']:.2f}"],
-                    ["  <<Min>>  ", result['aggregation']['min']],
-                    ["  <<Max>>  ", result['aggregation']['max']],
+                    ["  <<SUM>>  ", aggregation['total']],
+                    ["<<Average>>", f"{aggregation['average']:.2f}"],
+                    ["  <<Min>>  ", aggregation['min']],
+                    ["  <<Max>>  ", aggregation['max']],
                     
                     ["-" * 12, "-" * 20],  # Lines
                     
-                    ["<<Min_time>>", result['aggregation']['min_time']],
-                    ["<<Max_time>>", result['aggregation']['max_time']],
+                    ["<<Min_time>>", aggregation['min_time']],
+                    ["<<Max_time>>", aggregation['max_time']],
                 ]
                 print("\nRange aggregation results：")
                 print(tabulate(aggregation_data, headers=["Aggregation Type", "Value"], tablefmt="fancy_grid"))
@@ -165,6 +241,7 @@ def main():
             start_key = input("Enter the range start time: (Format: YYYY-MM-DD HH:MM:SS): ")
             end_key = input("Enter the start time (Format: YYYY-MM-DD HH:MM:SS): ")
             bpt.delete_range(start_key, end_key)
+            planner.invalidate()
             print(f"Range {start_key} to {end_key} Deleted！")
             
             
@@ -175,11 +252,12 @@ def main():
                 
                 
                 sensor_id = int(input("Inpute Sensor ID (5-number(xxxxx)): "))
-                result = bpt.query_by_id(sensor_id)
+                records = planner.iter_by_id(sensor_id)
+                first = next(records, None)
 
-                if result:
+                if first is not None:
                     print(f"\nSensor ID  {sensor_id} ：")
-                    bpt.format_output(result)
+                    write_rows(record_rows(itertools.chain([first], records)), sys.stdout, "table")
                 else:
                     print(f"No Find Sensor ID {sensor_id}  database。")
             except ValueError:
@@ -195,15 +273,56 @@ def main():
             
         elif choice == '7':
             print("Displays the first 20 pieces of data in the database：")
-            display_database_records(database_path, table_name, limit=20)
+            display_database_records(database_path, table_name, limit=20, planner=planner)
+
+
+        elif choice == '8':
+            print_metrics(bpt)
             
           
             
         elif choice == '0':
+            if metrics_file:
+                write_prometheus(bpt, metrics_file)
             print("EXIT！")
             sys.exit()
         else:
             print("No Options, re-enter！")
 
+        if metrics_file:
+            write_prometheus(bpt, metrics_file)
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default=DATABASE_PATH, help="SQLite database file")
+    parser.add_argument("--window", type=int, default=None, metavar="DAYS",
+                        help="keep only the last DAYS days in memory")
+    parser.add_argument("--snapshot", help="run from this snapshot (Creat_database.py --snapshot) "
+                                           "instead of --database; changes are not saved")
+    parser.add_argument("--metrics", action="store_true", help="enable tree instrumentation")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file after each operation")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+
+    # python Main.py query --range START END --format csv > out.csv
+    subparsers = parser.add_subparsers(dest="command")
+    query_parser = subparsers.add_parser("query", help="export records without the interactive menu")
+    query_parser.add_argument("--range", nargs=2, metavar=("START", "END"),
+                              help='timestamps, e.g. "2024-01-01 00:00:00" "2024-01-31 23:59:59"')
+    query_parser.add_argument("--sensor", type=int, help="only this sensor ID")
+    query_parser.add_argument("--format", choices=FORMATS, default="table")
+    query_parser.add_argument("--output", help="write to this file instead of stdout")
+    query_parser.add_argument("--page-size", type=positive_int, default=50, help="rows per table page")
+    args = parser.parse_args()
+    if args.snapshot and args.window is not None:
+        parser.error("--snapshot loads the full tree and cannot be combined with --window")
+
+    if args.command == "query":
+        if args.range is None and args.sensor is None:
+            query_parser.error("give --range and/or --sensor")
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+        start_key, end_key = args.range if args.range else FULL_RANGE
+        run_query(args.database, start_key, end_key, args.sensor, args.format,
+                  args.output, args.page_size, args.window)
+    else:
+        main(hot_window_days=args.window, metrics=args.metrics, metrics_file=args.metrics_file,
+             metrics_port=args.metrics_port, database_path=args.database, snapshot=args.snapshot)
@@ -0,0 +1,376 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import argparse
+import platform
+import tempfile
+import datetime
+import statistics
+import multiprocessing
+from BPlus_Tree import BPlusTree
+from Main import load_data_from_database_to_bptree
+from Creat_database import create_table
+from tabulate import tabulate
+from performance_test import generate_test_data
+
+# Datasets always use the pure-Python generator so a seed means the same rows
+# whether or not NumPy is installed
+DATASET_GENERATOR = 'python'
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DATASETS = {
+    'monotonic_many': {'random_order': False, 'sensor_count': 10000},
+    'monotonic_few': {'random_order': False, 'sensor_count': 10},
+    'random_many': {'random_order': True, 'sensor_count': 10000},
+    'random_few': {'random_order': True, 'sensor_count': 10},
+}
+
+
+class TreeBackend:
+    """In-memory BPlusTree, no SQLite write-through."""
+
+    name = 'tree'
+
+    def __init__(self, order=20):
+        self.bpt = BPlusTree(order=order)
+
+    def load(self, rows):
+        for row in rows:
+            self.bpt.insert(*row)
+
+    def insert(self, row):
+        self.bpt.insert(*row)
+
+    def search(self, key):
+        return self.bpt.search(key)
+
+    def range_query(self, start_key, end_key):
+        return self.bpt.range_query(start_key, end_key)
+
+    def query_by_id(self, sensor_id):
+        return self.bpt.query_by_id(sensor_id)
+
+    def delete_range(self, start_key, end_key):
+        self.bpt.delete_range(start_key, end_key)
+
+    def close(self):
+        pass
+
+
+class WriteThroughTreeBackend(TreeBackend):
+    """BPlusTree on a SQLite file, as Main runs it: every insert/delete also commits to SQLite."""
+
+    name = 'tree_writethrough'
+
+    def __init__(self, order=20):
+        self.path = tempfile.NamedTemporaryFile(delete=False, suffix=".db").name
+        # Creat_database's schema (INTEGER sensor_id), not BPlusTree's TEXT fallback
+        conn = sqlite3.connect(self.path)
+        create_table(conn.cursor())
+        conn.close()
+        self.bpt = BPlusTree(order=order, database_path=self.path)
+
+    def load(self, rows):
+        # Untimed setup: bulk-load SQLite, then build the tree the way Main does at startup
+        conn = sqlite3.connect(self.path)
+        conn.executemany(f"INSERT OR IGNORE INTO {self.bpt.table_name} VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+        self.bpt = BPlusTree(order=self.bpt.order, database_path=self.path)
+        load_data_from_database_to_bptree(self.bpt, self.path, self.bpt.table_name)
+
+    def close(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SQLiteBackend:
+    """Plain SQLite table with the same indexes Creat_database.py builds."""
+
+    name = 'sqlite'
+
+    def __init__(self):
+        self.path = tempfile.NamedTemporaryFile(delete=False, suffix=".db").name
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("""
+            CREATE TABLE sensor_data (
+                timestamp TEXT NOT NULL,
+                sensor_id INTEGER NOT NULL,
+                value REAL NOT NULL,
+                location TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                PRIMARY KEY (timestamp, sensor_id)
+            )
+        """)
+        self.conn.execute("CREATE INDEX idx_timestamp ON sensor_data (timestamp)")
+        self.conn.execute("CREATE INDEX idx_sensor_id ON sensor_data (sensor_id)")
+        self.conn.commit()
+
+    def load(self, rows):
+        self.conn.executemany("INSERT OR IGNORE INTO sensor_data VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def insert(self, row):
+        self.conn.execute("INSERT OR IGNORE INTO sensor_data VALUES (?, ?, ?, ?, ?)", row)
+        self.conn.commit()
+
+    def search(self, key):
+        return self.conn.execute(
+            "SELECT * FROM sensor_data WHERE timestamp = ? LIMIT 1", (key,)).fetchone()
+
+    def range_query(self, start_key, end_key):
+        return self.conn.execute(
+            "SELECT * FROM sensor_data WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp",
+            (start_key, end_key)).fetchall()
+
+    def query_by_id(self, sensor_id):
+        return self.conn.execute(
+            "SELECT * FROM sensor_data WHERE sensor_id = ? ORDER BY timestamp", (sensor_id,)).fetchall()
+
+    def delete_range(self, start_key, end_key):
+        self.conn.execute("DELETE FROM sensor_data WHERE timestamp BETWEEN ? AND ?", (start_key, end_key))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+BACKENDS = {'tree': TreeBackend, 'tree_writethrough': WriteThroughTreeBackend, 'sqlite': SQLiteBackend}
+
+
+# Each workload prepares the backend (untimed), then returns one callable per
+# operation; only the callables are timed.
+
+def _insert_workload(backend, rows, keys, rng, ops):
+    return [lambda row=row: backend.insert(row) for row in rows[:ops]]
+
+
+def _search_workload(backend, rows, keys, rng, ops):
+    backend.load(rows)
+    return [lambda key=rng.choice(keys): backend.search(key) for _ in range(ops)]
+
+
+def _range_workload(backend, rows, keys, rng, ops, range_size=100):
+    backend.load(rows)
+    calls = []
+    for _ in range(ops):
+        start = rng.randrange(max(1, len(keys) - range_size))
+        end = min(start + range_size, len(keys)) - 1
+        calls.append(lambda s=keys[start], e=keys[end]: backend.range_query(s, e))
+    return calls
+
+
+def _query_by_id_workload(backend, rows, keys, rng, ops):
+    backend.load(rows)
+    sensor_ids = sorted({row[1] for row in rows})
+    return [lambda sensor_id=rng.choice(sensor_ids): backend.query_by_id(sensor_id) for _ in range(ops)]
+
+
+def _mixed_workload(read_ratio):
+    def workload(backend, rows, keys, rng, ops):
+        half = len(rows) // 2
+        backend.load(rows[:half])
+        loaded = [row[0] for row in rows[:half]]
+        pending = iter(rows[half:])
+        calls = []
+        for _ in range(ops):
+            row = next(pending, None) if rng.random() >= read_ratio else None
+            if row is None:
+                calls.append(lambda key=rng.choice(loaded): backend.search(key))
+            else:
+                calls.append(lambda row=row: backend.insert(row))
+        return calls
+    return workload
+
+
+def _retention_workload(backend, rows, keys, rng, ops):
+    # Deletes the oldest data in `ops` equal slices, like a retention job
+    backend.load(rows)
+    chunk = max(1, len(keys) // (2 * ops))
+    return [lambda i=i: backend.delete_range(keys[i * chunk], keys[(i + 1) * chunk - 1])
+            for i in range(min(ops, len(keys) // chunk))]
+
+
+WORKLOADS = {
+    'insert': _insert_workload,
+    'search': _search_workload,
+    'range_query': _range_workload,
+    'query_by_id': _query_by_id_workload,
+    'mixed_r90': _mixed_workload(0.9),
+    'mixed_r50': _mixed_workload(0.5),
+    'retention_delete': _retention_workload,
+}
+
+
+def build_dataset(name, num_records, seed):
+
+    config = DATASETS[name]
+    rows = generate_test_data(num_records, sensor_count=config['sensor_count'], seed=seed,
+                              backend=DATASET_GENERATOR)
+    if config['random_order']:
+        random.Random(seed).shuffle(rows)
+    return rows
+
+
+def peak_rss_kb():
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def percentile(sorted_values, pct):
+
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(dataset, workload, backend_name, rows, ops, trials, warmup, seed):
+
+    keys = sorted(row[0] for row in rows)
+    latencies = []
+    total_time = 0.0
+    for trial in range(warmup + trials):
+        backend = BACKENDS[backend_name]()
+        try:
+            rng = random.Random(seed + trial)
+            calls = WORKLOADS[workload](backend, rows, keys, rng, ops)
+            trial_latencies = []
+            for call in calls:
+                start_time = time.perf_counter()
+                call()
+                trial_latencies.append(time.perf_counter() - start_time)
+        finally:
+            backend.close()
+        if trial >= warmup:
+            latencies.extend(trial_latencies)
+            total_time += sum(trial_latencies)
+
+    latencies.sort()
+    to_us = lambda seconds: None if seconds is None else seconds * 1e6
+    return {
+        'dataset': dataset,
+        'workload': workload,
+        'backend': backend_name,
+        'records': len(rows),
+        'ops': len(latencies),
+        'trials': trials,
+        'median_us': to_us(statistics.median(latencies)) if latencies else None,
+        'p95_us': to_us(percentile(latencies, 95)),
+        'p99_us': to_us(percentile(latencies, 99)),
+        'ops_per_sec': len(latencies) / total_time if total_time else None,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def _run_isolated_case(dataset, workload, backend_name, num_records, ops, trials, warmup, seed):
+
+    # Runs in a fresh child process, so ru_maxrss is this case's own peak
+    rows = build_dataset(dataset, num_records, seed)
+    return run_case(dataset, workload, backend_name, rows, ops, trials, warmup, seed)
+
+
+def run_benchmarks(num_records=2000, ops=200, trials=5, warmup=1, seed=42,
+                   datasets=None, workloads=None, backends=None, isolate=True):
+    """
+    Runs every dataset x workload x backend combination and returns a
+    JSON-serialisable report. With `isolate` each case runs in its own
+    spawned process, so peak_rss_kb is per case; without it peak_rss_kb is
+    the whole run's peak so far.
+    """
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BPlus_Tree.py'), 'rb') as f:
+        tree_sha = hashlib.sha256(f.read()).hexdigest()
+
+    results = []
+    pool = multiprocessing.get_context('spawn').Pool(processes=1, maxtasksperchild=1) if isolate else None
+    try:
+        for dataset in datasets or list(DATASETS):
+            rows = None if isolate else build_dataset(dataset, num_records, seed)
+            for workload in workloads or list(WORKLOADS):
+                for backend_name in backends or list(BACKENDS):
+                    if isolate:
+                        results.append(pool.apply(_run_isolated_case, (dataset, workload, backend_name,
+                                                                       num_records, ops, trials, warmup, seed)))
+                    else:
+                        results.append(run_case(dataset, workload, backend_name, rows, ops, trials, warmup, seed))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sqlite': sqlite3.sqlite_version,
+            'bplus_tree_sha256': tree_sha,
+            'records': num_records,
+            'ops': ops,
+            'trials': trials,
+            'warmup': warmup,
+            'seed': seed,
+            'generator': DATASET_GENERATOR,
+            'isolated': isolate,
+        },
+        'results': results,
+    }
+
+
+def print_summary(report):
+
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    data = [
+        [r['dataset'], r['workload'], r['backend'], fmt(r['median_us']), fmt(r['p95_us']),
+         fmt(r['p99_us']), fmt(r['ops_per_sec']), r['peak_rss_kb']]
+        for r in report['results']
+    ]
+    headers = ["Dataset", "Workload", "Backend", "median us", "p95 us", "p99 us", "ops/s", "peak RSS KB"]
+    print(tabulate(data, headers=headers, tablefmt="grid"))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="B+ tree vs SQLite benchmark suite")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=200, help="operations per trial")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS))
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS))
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS))
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run all cases in this process (faster, but peak RSS is no longer per case)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.records, args.ops, args.trials, args.warmup, args.seed,
+                            args.datasets, args.workloads, args.backends, isolate=not args.in_process)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_summary(report)
+        print(f"\nReport saved at: {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import datetime
+import pytest
+from Creat_database import bulk_load, generate_chunks
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    # 30 days of hourly readings from 2024-01-01
+    path = str(tmp_path / "sensor_data.db")
+    bulk_load(path, generate_chunks(30 * 24, range(10000, 10010), interval_seconds=3600,
+                                    start_time=datetime.datetime(2024, 1, 1), seed=1))
+    return path
@@ -0,0 +1,46 @@
+import csv
+import json
+from tabulate import tabulate_pages
+
+HEADERS = ["Timestamp", "Sensor ID", "Value", "Location", "Data Type"]
+FIELDS = ['timestamp', 'sensor_id', 'value', 'location', 'data_type']
+FORMATS = ('table', 'csv', 'ndjson')
+
+
+def record_rows(records):
+
+    # (timestamp, record dict) pairs from the tree -> flat row tuples
+    for timestamp, data in records:
+        yield (timestamp, data['sensor_id'], data['value'], data['location'], data['data_type'])
+
+
+def write_rows(rows, out, fmt='table', page_size=50, sample_size=1000):
+    """
+    Writes `rows` to the file object `out` one row at a time and returns the
+    row count. Only the table format buffers anything (a bounded width sample).
+    """
+    count = 0
+    if fmt == 'table':
+        counter = [0]
+
+        def counted():
+            for row in rows:
+                counter[0] += 1
+                yield row
+
+        for line in tabulate_pages(counted(), HEADERS, page_size, sample_size):
+            out.write(line + "\n")
+        count = counter[0]
+    elif fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    elif fmt == 'ndjson':
+        for row in rows:
+            out.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+            count += 1
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+    return count
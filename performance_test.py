@@ -1,25 +1,22 @@
 import  os
-import random
 import datetime
 import time
 import sqlite3
 import tempfile
 from tabulate import tabulate
+from Creat_database import generate_chunks
 
-def generate_test_data(num_records, start_time=None):
+def generate_test_data(num_records, start_time=None, sensor_count=10000, seed=None, backend=None):
     
     if start_time is None:
         start_time = datetime.datetime(2024, 1, 1, 1, 0, 0)
 
     test_data = []
-    for i in range(num_records):
-       
-        timestamp = (start_time + datetime.timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S')
-        sensor_id = random.randint(10000, 19999)  
-        value = round(random.uniform(30.0, 70.0), 1)  
-        location = f"Field_{random.randint(1, 7)}"  
-        data_type = random.choice(["Temp", "Light", "Humidity"])  
-        test_data.append((timestamp, sensor_id, value, location, data_type))
+    for chunk in generate_chunks(num_records, range(10000, 10000 + sensor_count), interval_seconds=1,
+                                 start_time=start_time, value_range=(30.0, 70.0),
+                                 locations=[f"Field_{i}" for i in range(1, 8)],
+                                 data_types=["Temp", "Light", "Humidity"], seed=seed, backend=backend):
+        test_data.extend(chunk)
 
     return test_data
 
@@ -0,0 +1,467 @@
+import sqlite3
+import math
+import time
+import datetime
+import logging
+from BPlus_Tree import FULL_RANGE, aggregate_records
+
+logger = logging.getLogger(__name__)
+
+# Cost units per row / per query, relative to one in-memory key comparison
+MEMORY_ROW_COST = 1.0
+SQLITE_ROW_COST = 4.0
+SQLITE_QUERY_COST = 200.0
+# A faulted-in day stays cached, so its load cost is spread over this many queries
+FAULT_REUSE = 4.0
+
+
+class QueryPlanner:
+    """
+    Routes each query either to the in-memory B+ tree or down to SQLite.
+    Each query is costed both ways and the cheaper source wins. Memory is a
+    candidate only when the tree holds the key range (warm) or can fault the
+    missing days in (windowed tree), and faulting adds the cost of loading
+    those days; otherwise filters and aggregates are pushed to SQLite, which
+    uses idx_timestamp / idx_sensor_id. With no database_path (a tree loaded
+    from a snapshot) every query is answered from memory.
+    """
+
+    def __init__(self, bpt, database_path, table_name="sensor_data"):
+        self.bpt = bpt
+        self.database_path = database_path
+        self.table_name = table_name
+        self.last_plan = None
+        self._table_stats = None
+
+    def table_statistics(self, refresh=False):
+
+        if self._table_stats is not None and not refresh:
+            return self._table_stats
+        if self.database_path is None:
+            self._table_stats = self._tree_table_statistics()
+            return self._table_stats
+
+        conn = sqlite3.connect(self.database_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table_name,))
+        if cursor.fetchone() is None:
+            conn.close()
+            logger.warning("table %s not found in %s, planning as if empty", self.table_name, self.database_path)
+            self._table_stats = {'rows': 0, 'rows_per_sensor': 1, 'min_key': None, 'max_key': None}
+            return self._table_stats
+
+        rows = None
+        rows_per_sensor = None
+        try:
+            # sqlite_stat1 only exists after ANALYZE; stat is "nrows avg_rows_per_key ..."
+            cursor.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = ?", (self.table_name,))
+            for idx, stat in cursor.fetchall():
+                parts = [int(p) for p in stat.split() if p.isdigit()]
+                if not parts:
+                    continue
+                rows = parts[0]
+                if idx == "idx_sensor_id" and len(parts) > 1:
+                    rows_per_sensor = parts[1]
+        except sqlite3.OperationalError:
+            pass
+
+        if rows is None:
+            # MAX(rowid) is a single b-tree lookup, unlike COUNT(*); it overcounts
+            # after deletes, which is fine for an estimate
+            try:
+                cursor.execute(f"SELECT MAX(rowid) FROM {self.table_name}")
+                rows = cursor.fetchone()[0] or 0
+            except sqlite3.OperationalError:
+                # WITHOUT ROWID tables
+                try:
+                    cursor.execute(f"SELECT COUNT(*) FROM {self.table_name}")
+                    rows = cursor.fetchone()[0]
+                except sqlite3.OperationalError:
+                    rows = 0
+        cursor.execute(f"""
+            SELECT MIN(timestamp), MAX(timestamp) FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ?
+        """, FULL_RANGE)
+        min_key, max_key = cursor.fetchone()
+
+        if rows_per_sensor is None:
+            sensors = len(self.bpt.id_index)
+            if not sensors:
+                # Cold tree: guess the sensor count from the ID span (two index lookups)
+                cursor.execute(f"SELECT MIN(sensor_id), MAX(sensor_id) FROM {self.table_name}")
+                low, high = cursor.fetchone()
+                try:
+                    sensors = int(high) - int(low) + 1
+                except (TypeError, ValueError):
+                    sensors = 1
+            rows_per_sensor = max(1, rows // max(sensors, 1))
+        conn.close()
+
+        self._table_stats = {
+            'rows': rows,
+            'rows_per_sensor': rows_per_sensor,
+            'min_key': min_key,
+            'max_key': max_key,
+        }
+        return self._table_stats
+
+    def _tree_table_statistics(self):
+
+        # No database behind the tree (snapshot mode): the tree is the table
+        tree_stats = self.bpt.tree_statistics()
+        return {
+            'rows': self.bpt.record_count,
+            'rows_per_sensor': max(1, self.bpt.record_count // max(len(self.bpt.id_index), 1)),
+            'min_key': tree_stats['min_key'],
+            'max_key': tree_stats['max_key'],
+        }
+
+    def invalidate(self):
+
+        # Call after writes so the next plan re-reads table statistics
+        self._table_stats = None
+
+    def estimate_range_rows(self, start_key, end_key, rows, min_key, max_key):
+
+        # Assumes timestamps are spread evenly between min_key and max_key
+        if not rows:
+            return 0
+        low = _to_seconds(min_key)
+        high = _to_seconds(max_key)
+        start = _to_seconds(start_key)
+        end = _to_seconds(end_key)
+        if None in (low, high) or high <= low:
+            return rows
+        start = low if start is None else max(start, low)
+        end = high if end is None else min(end, high)
+        if end < start:
+            return 0
+        return max(1, int(rows * (end - start) / (high - low)))
+
+    def _plan(self, operation, start_key, end_key, est_rows):
+
+        table_stats = self.table_statistics()
+        costs = {}
+        if self.database_path is not None:
+            costs['sqlite'] = (SQLITE_QUERY_COST
+                               + math.log2(max(table_stats['rows'], 2))
+                               + est_rows * SQLITE_ROW_COST)
+
+        uncached = self.bpt.uncached_days(start_key, end_key)
+        # Without a database the tree is the only source
+        if uncached is not None or self.database_path is None:
+            memory_cost = self.bpt.tree_statistics()['height'] + est_rows * MEMORY_ROW_COST
+            if uncached:
+                day_cost = SQLITE_QUERY_COST + self._rows_per_day() * SQLITE_ROW_COST
+                memory_cost += uncached * day_cost / FAULT_REUSE
+            costs['memory'] = memory_cost
+
+        source = min(costs, key=costs.get)
+        return {'operation': operation, 'source': source,
+                'est_rows': est_rows, 'est_cost': costs[source], 'costs': costs}
+
+    def _rows_per_day(self):
+
+        stats = self.table_statistics()
+        low = _to_seconds(stats['min_key'])
+        high = _to_seconds(stats['max_key'])
+        if None in (low, high) or high <= low:
+            return stats['rows']
+        return stats['rows'] * 86400 / (high - low)
+
+    def _estimate_range(self, start_key, end_key):
+
+        stats = self.table_statistics()
+        rows = stats['rows']
+        # A fully loaded tree knows its exact row count, including unflushed inserts
+        if self.bpt.loaded_range == FULL_RANGE:
+            rows = self.bpt.record_count
+        return self.estimate_range_rows(start_key, end_key, rows, stats['min_key'], stats['max_key'])
+
+    def _execute(self, plan, memory_fn, sqlite_fn):
+
+        start_time = time.perf_counter()
+        result = memory_fn() if plan['source'] == 'memory' else sqlite_fn()
+        plan['actual_ms'] = (time.perf_counter() - start_time) * 1000
+        plan['actual_rows'] = _result_rows(result)
+        self.last_plan = plan
+        _log_plan(plan)
+        return result
+
+    def _execute_stream(self, plan, memory_fn, sqlite_fn):
+
+        # Like _execute, but cost is only known once the caller drains the stream
+        start_time = time.perf_counter()
+        rows = 0
+        try:
+            for record in (memory_fn() if plan['source'] == 'memory' else sqlite_fn()):
+                rows += 1
+                yield record
+        finally:
+            plan['actual_ms'] = (time.perf_counter() - start_time) * 1000
+            plan['actual_rows'] = rows
+            self.last_plan = plan
+            _log_plan(plan)
+
+    def explain(self):
+
+        if self.last_plan is None:
+            return "No query planned yet."
+        p = self.last_plan
+        return (f"{p['operation']} -> {p['source']} "
+                f"(est rows {p['est_rows']}, est cost {p['est_cost']:.1f}, "
+                f"actual rows {p['actual_rows']}, actual {p['actual_ms']:.3f} ms)")
+
+    def search(self, key):
+
+        plan = self._plan('search', key, key, 1)
+        return self._execute(plan, lambda: self.bpt.search(key), lambda: self._sql_search(key))
+
+    def range_query(self, start_key, end_key):
+
+        est = self._estimate_range(start_key, end_key)
+        plan = self._plan('range_query', start_key, end_key, est)
+        return self._execute(plan,
+                             lambda: self.bpt.range_query(start_key, end_key),
+                             lambda: self._sql_range(start_key, end_key))
+
+    def range_query_with_aggregation(self, start_key, end_key):
+
+        est = self._estimate_range(start_key, end_key)
+        plan = self._plan('range_query_with_aggregation', start_key, end_key, est)
+        return self._execute(plan,
+                             lambda: self.bpt.range_query_with_aggregation(start_key, end_key),
+                             lambda: self._sql_range_with_aggregation(start_key, end_key))
+
+    def range_aggregate(self, start_key, end_key):
+
+        # Summary only, for callers that stream the rows themselves
+        est = self._estimate_range(start_key, end_key)
+        plan = self._plan('range_aggregate', start_key, end_key, est)
+        return self._execute(plan,
+                             lambda: aggregate_records(self.bpt.range_query(start_key, end_key)),
+                             lambda: self._sql_range_aggregate(start_key, end_key))
+
+    def iter_range(self, start_key, end_key):
+
+        est = self._estimate_range(start_key, end_key)
+        plan = self._plan('iter_range', start_key, end_key, est)
+        return self._execute_stream(plan,
+                                    lambda: self.bpt.iter_range(start_key, end_key),
+                                    lambda: self._sql_iter_range(start_key, end_key))
+
+    def iter_by_id(self, sensor_id, start_key=FULL_RANGE[0], end_key=FULL_RANGE[1]):
+
+        stats = self.table_statistics()
+        est = self.estimate_range_rows(start_key, end_key, stats['rows_per_sensor'],
+                                       stats['min_key'], stats['max_key'])
+        plan = self._plan('iter_by_id', FULL_RANGE[0], FULL_RANGE[1], est)
+        return self._execute_stream(plan,
+                                    lambda: self._memory_iter_by_id(sensor_id, start_key, end_key),
+                                    lambda: self._sql_iter_by_id(sensor_id, start_key, end_key))
+
+    def query_by_id(self, sensor_id):
+
+        plan = self._plan('query_by_id', FULL_RANGE[0], FULL_RANGE[1],
+                          self.table_statistics()['rows_per_sensor'])
+        return self._execute(plan,
+                             lambda: self.bpt.query_by_id(sensor_id),
+                             lambda: self._sql_by_id(sensor_id))
+
+    def first_records(self, limit=20):
+
+        plan = self._plan('first_records', FULL_RANGE[0], FULL_RANGE[1], limit)
+        return self._execute(plan, lambda: self._memory_first(limit), lambda: self._sql_first(limit))
+
+    def _memory_first(self, limit):
+
+        if self.bpt.loaded_range != FULL_RANGE:
+            # Partially resident trees stitch cached segments together in range_query
+            return [(key, value['sensor_id'], value['value'], value['location'], value['data_type'])
+                    for key, value in self.bpt.range_query(*FULL_RANGE)[:limit]]
+
+        records = []
+        node = self.bpt._find_leaf_node(FULL_RANGE[0])
+        while node is not None and len(records) < limit:
+            for key, value in node.keys[:limit - len(records)]:
+                records.append((key, value['sensor_id'], value['value'], value['location'], value['data_type']))
+            node = node.next_leaf
+        return records
+
+    def _memory_iter_by_id(self, sensor_id, start_key, end_key):
+
+        sub_tree = self.bpt.id_index.get(sensor_id)
+        if self.bpt.loaded_range == FULL_RANGE:
+            return sub_tree.iter_range(start_key, end_key) if sub_tree is not None else iter(())
+        return (r for r in self.bpt.query_by_id(sensor_id) if start_key <= r[0] <= end_key)
+
+    def _fetch(self, sql, params):
+
+        conn = sqlite3.connect(self.database_path)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def _sql_search(self, key):
+
+        rows = self._fetch(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE timestamp = ?
+            LIMIT 1
+        """, (key,))
+        return _row_to_record(rows[0]) if rows else None
+
+    def _sql_range(self, start_key, end_key):
+
+        rows = self._fetch(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ?
+            ORDER BY timestamp
+        """, (start_key, end_key))
+        return [(row[0], _row_to_record(row)) for row in rows]
+
+    def _sql_iter_range(self, start_key, end_key):
+
+        return self._sql_iter(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ?
+            ORDER BY timestamp
+        """, (start_key, end_key))
+
+    def _sql_iter_by_id(self, sensor_id, start_key, end_key):
+
+        return self._sql_iter(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE sensor_id = ? AND timestamp BETWEEN ? AND ?
+            ORDER BY timestamp
+        """, (sensor_id, start_key, end_key))
+
+    def _sql_iter(self, sql, params, batch_size=5000):
+
+        conn = sqlite3.connect(self.database_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row[0], _row_to_record(row)
+        finally:
+            conn.close()
+
+    def _sql_range_with_aggregation(self, start_key, end_key):
+
+        # The aggregates are pushed down to SQLite; they and the row fetch run
+        # in one read transaction on one connection, so both see the same data
+        conn = sqlite3.connect(self.database_path, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            aggregation = self._sql_aggregate(cursor, start_key, end_key)
+            cursor.execute(f"""
+                SELECT timestamp, sensor_id, value, location, data_type
+                FROM {self.table_name}
+                WHERE timestamp BETWEEN ? AND ?
+                ORDER BY timestamp
+            """, (start_key, end_key))
+            rows = cursor.fetchall()
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+        return {'data': [(row[0], _row_to_record(row)) for row in rows], 'aggregation': aggregation}
+
+    def _sql_range_aggregate(self, start_key, end_key):
+
+        conn = sqlite3.connect(self.database_path, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            aggregation = self._sql_aggregate(cursor, start_key, end_key)
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+        return aggregation
+
+    def _sql_aggregate(self, cursor, start_key, end_key):
+
+        params = (start_key, end_key)
+        cursor.execute(f"""
+            SELECT SUM(value), AVG(value), MIN(value), MAX(value), COUNT(*)
+            FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ?
+        """, params)
+        total, avg, min_value, max_value, count = cursor.fetchone()
+
+        aggregation = aggregate_records([])
+        if count:
+            aggregation.update(total=total, average=avg, min=min_value, max=max_value)
+            for name, value in (('min_time', min_value), ('max_time', max_value)):
+                # Ties go to the earliest row, as in aggregate_records
+                cursor.execute(f"""
+                    SELECT MIN(timestamp) FROM {self.table_name}
+                    WHERE timestamp BETWEEN ? AND ? AND value = ?
+                """, params + (value,))
+                aggregation[name] = cursor.fetchone()[0]
+        return aggregation
+
+    def _sql_by_id(self, sensor_id):
+
+        rows = self._fetch(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE sensor_id = ?
+            ORDER BY timestamp
+        """, (sensor_id,))
+        return [(row[0], _row_to_record(row)) for row in rows]
+
+    def _sql_first(self, limit):
+
+        return self._fetch(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            ORDER BY timestamp ASC
+            LIMIT ?
+        """, (limit,))
+
+
+def _log_plan(plan):
+    logger.info(
+        "plan op=%s source=%s est_rows=%d est_cost=%.1f candidates=%s actual_rows=%d actual_ms=%.3f",
+        plan['operation'], plan['source'], plan['est_rows'], plan['est_cost'],
+        ",".join(f"{source}:{cost:.1f}" for source, cost in plan['costs'].items()),
+        plan['actual_rows'], plan['actual_ms'],
+    )
+
+
+def _row_to_record(row):
+    timestamp, sensor_id, value, location, data_type = row
+    return {
+        'timestamp': timestamp,
+        'sensor_id': sensor_id,
+        'value': value,
+        'location': location,
+        'data_type': data_type,
+    }
+
+
+def _to_seconds(key):
+    try:
+        return datetime.datetime.strptime(key, '%Y-%m-%d %H:%M:%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _result_rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return len(result['data']) if 'data' in result else 1
+    return len(result)
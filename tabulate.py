@@ -32,3 +32,76 @@ def tabulate(data, headers=None, tablefmt="grid"):
     table += rows + "\n" + horizontal_line
 
     return table
+
+
+TRUNCATION_MARK = "~"
+
+
+def estimate_col_widths(sample, headers=None, max_width=None):
+    """
+    Column widths from a bounded sample of rows instead of the full data.
+    Cells wider than the estimate are cut by tabulate_pages and marked with
+    TRUNCATION_MARK.
+    """
+    width_count = len(headers) if headers else (len(sample[0]) if sample else 0)
+    col_widths = [len(str(col)) for col in headers] if headers else [0] * width_count
+    for row in sample:
+        col_widths = [max(len(str(cell)), w) for cell, w in zip(row, col_widths)]
+    if max_width is not None:
+        col_widths = [min(w, max_width) for w in col_widths]
+    return col_widths
+
+
+def tabulate_pages(rows, headers=None, page_size=50, sample_size=1000, max_width=40):
+    """
+    Streaming 'grid' table: yields one line at a time, repeating the header
+    every `page_size` rows. Only the first `sample_size` rows are held in
+    memory, to estimate column widths; cells that do not fit end in "~".
+    """
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    if max_width is not None and max_width < 1:
+        raise ValueError(f"max_width must be at least 1, got {max_width}")
+    return _tabulate_pages(iter(rows), headers, page_size, sample_size, max_width)
+
+
+def _tabulate_pages(rows, headers, page_size, sample_size, max_width):
+
+    sample = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) >= sample_size:
+            break
+    if not sample:
+        yield "No data available."
+        return
+
+    col_widths = estimate_col_widths(sample, headers, max_width)
+    horizontal_line = "+" + "+".join(["-" * (w + 2) for w in col_widths]) + "+"
+
+    def format_cell(cell, w):
+        text = str(cell)
+        if len(text) > w:
+            text = text[:w - 1] + TRUNCATION_MARK
+        return f" {text.ljust(w)} "
+
+    def format_row(row):
+        return "|" + "|".join([format_cell(cell, w) for cell, w in zip(row, col_widths)]) + "|"
+
+    def page_header():
+        yield horizontal_line
+        if headers:
+            yield format_row(headers)
+            yield horizontal_line
+
+    count = 0
+    for source in (sample, rows):
+        for row in source:
+            if count % page_size == 0:
+                if count:
+                    yield horizontal_line
+                    yield ""
+                yield from page_header()
+            yield format_row(row)
+            count += 1
+    yield horizontal_line
@@ -0,0 +1,60 @@
+import random
+import pytest
+from BPlus_Tree import BPlusTree, FULL_RANGE, read_snapshot, write_snapshot
+
+
+def test_root_splits_and_keys_stay_ordered():
+    tree = BPlusTree(order=4)
+    metrics = tree.enable_metrics()
+    keys = [f"2024-01-01 00:{m:02d}:{s:02d}" for m in range(10) for s in range(0, 60, 5)]
+    shuffled = keys[:]
+    random.Random(1).shuffle(shuffled)
+    for i, key in enumerate(shuffled):
+        tree.insert(key, 10000 + i % 3, 1.0, "Field_1", "Temp")
+
+    assert not tree.root.leaf
+    assert tree.stats()['gauges']['height'] > 1
+    assert metrics.counters['splits'] > 0
+    assert [key for key, _ in tree.range_query(keys[0], keys[-1])] == keys
+    assert all(tree.search(key)['timestamp'] == key for key in keys)
+
+    tree.delete_range(keys[3], keys[40])
+    assert [key for key, _ in tree.range_query(keys[0], keys[-1])] == keys[:3] + keys[41:]
+
+
+def count_nodes(tree):
+    stack, count = [tree.root], 0
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def test_node_count_is_maintained_on_insert():
+    tree = BPlusTree(order=4)
+    for i in range(200):
+        tree.insert(f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}", 10000 + i % 5, 1.0, "Field_1", "Temp")
+
+    gauges = tree.stats()['gauges']
+    assert tree.node_count == count_nodes(tree)
+    assert gauges['node_count'] == count_nodes(tree) + sum(count_nodes(t) for t in tree.id_index.values())
+    assert gauges['memory_estimate_bytes'] > 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    rows = [(f"2024-01-01 00:00:{s:02d}", 10000 + s % 3, s / 2, "Field_1", "Temp") for s in range(40)]
+    path = tmp_path / "tree.snapshot"
+    assert write_snapshot(path, [rows[:25], rows[25:]]) == len(rows)
+
+    tree = BPlusTree.load_snapshot(path, order=4)
+    assert [(key, r['sensor_id'], r['value'], r['location'], r['data_type'])
+            for key, r in tree.range_query(*FULL_RANGE)] == rows
+    assert len(tree.query_by_id(10001)) == 13
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"\x80\x05garbage")
+    with pytest.raises(ValueError):
+        list(read_snapshot(path))
@@ -0,0 +1,72 @@
+import io
+import csv
+import json
+import pytest
+from tabulate import TRUNCATION_MARK, tabulate_pages
+from export import FIELDS, HEADERS, record_rows, write_rows
+from BPlus_Tree import BPlusTree
+from query_planner import QueryPlanner
+from Main import run_query
+
+RANGE = ("2024-01-02 00:00:00", "2024-01-03 00:00:00")
+
+
+def test_tabulate_pages_repeats_header_every_page():
+    rows = [(i, f"row {i}") for i in range(5)]
+    lines = list(tabulate_pages(rows, ["id", "name"], page_size=2))
+
+    header = "| id | name  |"
+    assert lines.count(header) == 3
+    assert sum(line.startswith("| ") and line != header for line in lines) == 5
+    # pages are separated by a blank line
+    assert lines.count("") == 2
+    assert lines[-1].startswith("+")
+
+
+def test_tabulate_pages_marks_cells_wider_than_sample():
+    rows = [("a", "short"), ("b", "much longer than the sample")]
+    lines = list(tabulate_pages(rows, ["k", "v"], sample_size=1))
+
+    assert "| b | much~ |" in lines
+    assert all(len(line) == len(lines[0]) for line in lines)
+
+
+@pytest.mark.parametrize("page_size", [0, -1])
+def test_tabulate_pages_rejects_non_positive_page_size(page_size):
+    with pytest.raises(ValueError):
+        tabulate_pages([], page_size=page_size)
+
+
+def test_write_rows_table_returns_row_count():
+    rows = [("2024-01-01 00:00:00", 10000, 1.5, "Field_1", "Temp")] * 7
+    out = io.StringIO()
+
+    assert write_rows(iter(rows), out, "table", page_size=3) == 7
+    assert out.getvalue().count("| Timestamp ") == 3
+
+
+def test_run_query_csv_matches_sqlite(database_path, tmp_path):
+    expected = list(record_rows(QueryPlanner(BPlusTree(), database_path)._sql_range(*RANGE)))
+    output = tmp_path / "out.csv"
+
+    assert run_query(database_path, *RANGE, fmt="csv", output=str(output)) == len(expected)
+    with open(output, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        assert next(reader) == FIELDS
+        assert [tuple(row) for row in reader] == [tuple(str(cell) for cell in row) for row in expected]
+
+
+def test_run_query_ndjson_by_sensor_matches_sqlite(database_path, tmp_path):
+    rows = QueryPlanner(BPlusTree(), database_path)._sql_range(*RANGE)
+    expected = [dict(zip(FIELDS, row)) for row in record_rows(rows) if row[1] == 10003]
+    assert expected
+    output = tmp_path / "out.ndjson"
+
+    assert run_query(database_path, *RANGE, sensor_id=10003, fmt="ndjson", output=str(output)) == len(expected)
+    with open(output, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == expected
+
+
+def test_run_query_table_header(database_path, capsys):
+    assert run_query(database_path, *RANGE, page_size=10) == 25
+    assert capsys.readouterr().out.count("| " + HEADERS[0]) == 3
@@ -0,0 +1,80 @@
+import sqlite3
+import pytest
+from BPlus_Tree import BPlusTree, aggregate_records, write_snapshot
+from Main import load_data_from_database_to_bptree
+from windowed_tree import WindowedBPlusTree
+from query_planner import QueryPlanner
+
+RANGE = ("2024-01-02 00:00:00", "2024-01-09 00:00:00")
+
+
+def test_warm_tree_answers_from_memory(database_path):
+    tree = BPlusTree(database_path=database_path)
+    load_data_from_database_to_bptree(tree, database_path, "sensor_data")
+    planner = QueryPlanner(tree, database_path)
+
+    result = planner.range_query(*RANGE)
+    assert planner.last_plan['source'] == 'memory'
+    assert sorted(result, key=lambda r: r[0]) == planner._sql_range(*RANGE)
+
+
+def test_cold_tree_pushes_down_to_sqlite(database_path):
+    planner = QueryPlanner(BPlusTree(), database_path)
+
+    result = planner.range_query(*RANGE)
+    assert planner.last_plan['source'] == 'sqlite'
+    assert len(result) == 7 * 24 + 1
+
+
+def test_sqlite_aggregation_matches_fetched_rows(database_path):
+    planner = QueryPlanner(BPlusTree(), database_path)
+
+    result = planner.range_query_with_aggregation(*RANGE)
+    assert planner.last_plan['source'] == 'sqlite'
+    expected = aggregate_records(result['data'])
+    assert result['aggregation']['average'] == pytest.approx(expected.pop('average'))
+    assert result['aggregation']['total'] == pytest.approx(expected.pop('total'))
+    for name, value in expected.items():
+        assert result['aggregation'][name] == value
+
+
+def test_sqlite_aggregation_of_empty_range(database_path):
+    planner = QueryPlanner(BPlusTree(), database_path)
+
+    result = planner.range_query_with_aggregation("2025-01-01 00:00:00", "2025-01-02 00:00:00")
+    assert result == {'data': [], 'aggregation': aggregate_records([])}
+
+
+def test_table_statistics_without_sqlite_stat1(database_path):
+    conn = sqlite3.connect(database_path)
+    conn.execute("DROP TABLE sqlite_stat1")
+    conn.commit()
+    conn.close()
+
+    tree = WindowedBPlusTree(database_path=database_path, hot_window_days=3)
+    stats = QueryPlanner(tree, database_path).table_statistics()
+    assert stats['rows'] == 30 * 24
+    assert stats['max_key'] == "2024-01-30 23:00:00"
+
+
+def test_snapshot_tree_without_database_answers_from_memory(tmp_path):
+    rows = [(f"2024-01-01 00:00:{s:02d}", 10000 + s % 4, float(s), "Field_1", "Temp") for s in range(60)]
+    path = tmp_path / "tree.snapshot"
+    write_snapshot(path, [rows])
+    planner = QueryPlanner(BPlusTree.load_snapshot(path), None)
+
+    result = planner.range_query_with_aggregation(rows[10][0], rows[19][0])
+    assert planner.last_plan['source'] == 'memory'
+    assert planner.last_plan['costs'].keys() == {'memory'}
+    assert result['aggregation']['total'] == sum(range(10, 20))
+    assert len(planner.query_by_id(10001)) == 15
+    assert planner.table_statistics()['max_key'] == rows[-1][0]
+
+
+def test_table_statistics_with_missing_table(tmp_path):
+    path = str(tmp_path / "empty.db")
+    sqlite3.connect(path).close()
+
+    stats = QueryPlanner(BPlusTree(), path).table_statistics()
+    assert stats['rows'] == 0
+    assert stats['max_key'] is None
@@ -0,0 +1,42 @@
+from windowed_tree import WindowedBPlusTree
+from query_planner import QueryPlanner
+
+
+def day_range(day):
+    return f"2024-01-{day:02d} 00:00:00", f"2024-01-{day:02d} 12:00:00"
+
+
+def test_planner_faults_cold_days_in(database_path):
+    tree = WindowedBPlusTree(database_path=database_path, hot_window_days=3, max_cached_segments=2)
+    planner = QueryPlanner(tree, database_path)
+
+    first = planner.range_query(*day_range(10))
+    assert planner.last_plan['source'] == 'memory'
+    assert tree.segment_faults == 1
+    assert list(tree.segments) == ['2024-01-10']
+    assert first == planner._sql_range(*day_range(10))
+
+    # Second hit is served from the cached segment
+    assert planner.range_query(*day_range(10)) == first
+    assert tree.segment_faults == 1
+
+
+def test_planner_segment_cache_evicts_lru(database_path):
+    tree = WindowedBPlusTree(database_path=database_path, hot_window_days=3, max_cached_segments=2)
+    planner = QueryPlanner(tree, database_path)
+
+    planner.range_query(*day_range(10))
+    planner.range_query(*day_range(11))
+    planner.range_query(*day_range(10))
+    planner.range_query(*day_range(12))
+    assert tree.segment_faults == 3
+    assert list(tree.segments) == ['2024-01-10', '2024-01-12']
+
+
+def test_planner_pushes_wide_cold_ranges_to_sqlite(database_path):
+    tree = WindowedBPlusTree(database_path=database_path, hot_window_days=3, max_cached_segments=2)
+    planner = QueryPlanner(tree, database_path)
+
+    planner.range_query("2024-01-02 00:00:00", "2024-01-09 00:00:00")
+    assert planner.last_plan['source'] == 'sqlite'
+    assert tree.segment_faults == 0
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, Prometheus style (upper bounds, +Inf implied)
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Tree method -> histogram name. sqlite_write covers every write-through call.
+TIMED_OPERATIONS = {
+    'insert': 'insert',
+    'search': 'search',
+    'range_query': 'range_query',
+    'delete_range': 'delete_range',
+    'query_by_id': 'query_by_id',
+    '_insert_into_database': 'sqlite_write',
+    '_delete_from_database_range': 'sqlite_write',
+}
+
+COUNTERS = ('nodes_visited', 'leaves_scanned', 'splits', 'rows_flushed', 'rows_deleted')
+
+
+class Histogram:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class TreeMetrics:
+    """
+    Counters and latency histograms for one BPlusTree. Latency is collected by
+    wrapping the tree's methods on the instance, so a tree without metrics
+    runs the plain class methods untouched.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {name: 0 for name in COUNTERS}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1):
+        # The HTTP exporter thread snapshots counters under the same lock
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def _timed(self, name, method):
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - start_time)
+        return wrapper
+
+    def instrument(self, tree):
+        for attr, name in TIMED_OPERATIONS.items():
+            setattr(tree, attr, self._timed(name, getattr(type(tree), attr).__get__(tree)))
+
+    def uninstrument(self, tree):
+        for attr in TIMED_OPERATIONS:
+            tree.__dict__.pop(attr, None)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+
+def render_prometheus(stats, prefix="bptree"):
+
+    lines = []
+    for name, value in stats.get('gauges', {}).items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value}")
+    for name, value in stats.get('counters', {}).items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+
+    histograms = stats.get('histograms', {})
+    if histograms:
+        metric = f"{prefix}_operation_duration_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for operation, h in histograms.items():
+            for bound, count in h['buckets'].items():
+                lines.append(f'{metric}_bucket{{operation="{operation}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{operation="{operation}",le="+Inf"}} {h["count"]}')
+            lines.append(f'{metric}_sum{{operation="{operation}"}} {h["sum"]}')
+            lines.append(f'{metric}_count{{operation="{operation}"}} {h["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(tree, path):
+
+    # Write then rename so a scraper never reads a half-written file
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        f.write(render_prometheus(tree.stats()))
+    os.replace(temp_path, path)
+
+
+def serve_prometheus(tree, port=9108, host="127.0.0.1"):
+    """Serves /metrics from a daemon thread; call .shutdown() on the result to stop."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(tree.stats()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
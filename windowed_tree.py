@@ -0,0 +1,206 @@
+import sqlite3
+import datetime
+from collections import OrderedDict
+from BPlus_Tree import BPlusTree, FULL_RANGE
+
+
+class WindowedBPlusTree(BPlusTree):
+    """
+    B+ tree that keeps only the most recent `hot_window_days` days in memory.
+    Older keys are faulted in from SQLite (through idx_timestamp) one day at a
+    time into small per-day trees, cached with LRU eviction.
+    """
+
+    def __init__(self, order=20, database_path=None, table_name="sensor_data",
+                 hot_window_days=7, max_cached_segments=32):
+        self.hot_window_days = hot_window_days
+        self.max_cached_segments = max_cached_segments
+        self.window_start = FULL_RANGE[0]
+        self.history_start = None
+        self.segments = OrderedDict()  # 'YYYY-MM-DD' -> BPlusTree
+        self.segment_faults = 0
+        super().__init__(order=order, database_path=database_path, table_name=table_name)
+
+    def _initialize_secondary_index(self):
+
+        # Only MIN/MAX (index lookups) and the hot window are read, so startup
+        # does not depend on how much history the table holds
+        conn = sqlite3.connect(self.database_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT MIN(timestamp), MAX(timestamp) FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ?
+        """, FULL_RANGE)
+        self.history_start, latest = cursor.fetchone()
+
+        if latest is not None:
+            latest = datetime.datetime.strptime(latest, '%Y-%m-%d %H:%M:%S')
+            start_day = latest.date() - datetime.timedelta(days=self.hot_window_days)
+            self.window_start = f"{start_day} 00:00:00"
+
+        cursor.execute(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE timestamp >= ?
+            ORDER BY timestamp
+        """, (self.window_start,))
+        records = cursor.fetchall()
+        conn.close()
+
+        for timestamp, sensor_id, value, location, data_type in records:
+            record = {
+                'timestamp': timestamp,
+                'sensor_id': sensor_id,
+                'value': value,
+                'location': location,
+                'data_type': data_type
+            }
+            self._insert_non_full(self.root, timestamp, record)
+            if sensor_id not in self.id_index:
+                self.id_index[sensor_id] = BPlusTree(order=self.order)
+            self.id_index[sensor_id]._insert_non_full(self.id_index[sensor_id].root, timestamp, record)
+
+        self.loaded_range = (self.window_start, FULL_RANGE[1])
+
+    def _cold_days(self, start_key, end_key):
+
+        # Days below the hot window touched by [start_key, end_key], or None if
+        # the keys cannot be split into day segments
+        if self.history_start is None:
+            return []
+        try:
+            first = datetime.datetime.strptime(max(start_key, self.history_start)[:10], '%Y-%m-%d').date()
+            window_day = datetime.datetime.strptime(self.window_start[:10], '%Y-%m-%d').date()
+            if end_key < self.window_start:
+                last = datetime.datetime.strptime(end_key[:10], '%Y-%m-%d').date()
+            else:
+                last = window_day - datetime.timedelta(days=1)
+        except ValueError:
+            return None
+        if last < first:
+            return []
+        return [str(first + datetime.timedelta(days=i)) for i in range((last - first).days + 1)]
+
+    def _segment(self, day):
+
+        segment = self.segments.get(day)
+        if segment is not None:
+            self.segments.move_to_end(day)
+            return segment
+
+        segment = BPlusTree(order=self.order)
+        for timestamp, record in self._fetch_range(f"{day} 00:00:00", f"{day} 23:59:59"):
+            segment._insert_non_full(segment.root, timestamp, record)
+        segment.loaded_range = (f"{day} 00:00:00", f"{day} 23:59:59")
+        self.segments[day] = segment
+        self.segment_faults += 1
+
+        while len(self.segments) > self.max_cached_segments:
+            self.segments.popitem(last=False)
+        return segment
+
+    def _fetch_range(self, start_key, end_key):
+
+        conn = sqlite3.connect(self.database_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT timestamp, sensor_id, value, location, data_type
+            FROM {self.table_name}
+            WHERE timestamp BETWEEN ? AND ? AND timestamp < ?
+            ORDER BY timestamp
+        """, (start_key, end_key, self.window_start))
+        rows = cursor.fetchall()
+        conn.close()
+        return [(row[0], {
+            'timestamp': row[0],
+            'sensor_id': row[1],
+            'value': row[2],
+            'location': row[3],
+            'data_type': row[4]
+        }) for row in rows]
+
+    def _cold_range(self, start_key, end_key):
+
+        days = self._cold_days(start_key, end_key)
+        # Ranges wider than the cache are streamed straight from SQLite instead
+        # of thrashing the segment cache
+        if days is None or len(days) > self.max_cached_segments:
+            return self._fetch_range(start_key, end_key)
+        result = []
+        for day in days:
+            result.extend(self._segment(day).range_query(start_key, end_key))
+        return result
+
+    def range_query(self, start_key, end_key):
+
+        result = []
+        if self.database_path and start_key < self.window_start:
+            result.extend(self._cold_range(start_key, end_key))
+        if end_key >= self.window_start:
+            result.extend(super().range_query(max(start_key, self.window_start), end_key))
+        return result
+
+    def iter_range(self, start_key, end_key):
+
+        if self.database_path and start_key < self.window_start:
+            yield from self._cold_range(start_key, end_key)
+        if end_key >= self.window_start:
+            yield from super().iter_range(max(start_key, self.window_start), end_key)
+
+    def search(self, key):
+
+        if key >= self.window_start or not self.database_path:
+            return super().search(key)
+        days = self._cold_days(key, key)
+        if days:
+            return self._segment(days[0]).search(key)
+        records = self._fetch_range(key, key)
+        return records[0][1] if records else None
+
+    def query_by_id(self, sensor_id):
+
+        cold = []
+        if self.database_path:
+            conn = sqlite3.connect(self.database_path)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT timestamp, value, location, data_type
+                FROM {self.table_name}
+                WHERE sensor_id = ? AND timestamp < ?
+                ORDER BY timestamp
+            """, (sensor_id, self.window_start))
+            cold = [(timestamp, {
+                'sensor_id': sensor_id,
+                'timestamp': timestamp,
+                'value': value,
+                'location': location,
+                'data_type': data_type
+            }) for timestamp, value, location, data_type in cursor.fetchall()]
+            conn.close()
+        return cold + super().query_by_id(sensor_id)
+
+    def uncached_days(self, start_key, end_key):
+
+        if super().covers(start_key, end_key):
+            return 0
+        days = self._cold_days(start_key, end_key)
+        # Same cut-off as _cold_range: wider ranges bypass the segment cache
+        if days is None or len(days) > self.max_cached_segments:
+            return None
+        return sum(1 for day in days if day not in self.segments)
+
+    def insert(self, timestamp, sensor_id, value, location, data_type):
+
+        if timestamp >= self.window_start:
+            super().insert(timestamp, sensor_id, value, location, data_type)
+            return
+        if self.database_path:
+            self._insert_into_database(timestamp, sensor_id, value, location, data_type)
+        self.segments.pop(timestamp[:10], None)
+
+    def delete_range(self, start_key, end_key):
+
+        super().delete_range(start_key, end_key)
+        for day in list(self.segments):
+            if not (f"{day} 23:59:59" < start_key or f"{day} 00:00:00" > end_key):
+                del self.segments[day]